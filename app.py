@@ -1,26 +1,32 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, timedelta
 import secrets
 
 from config import app_cfg
 from db import (
     init_db, ensure_owner,
-    get_user_by_email, create_user, update_user, list_users, set_user_status,
+    get_user_by_email, create_user, update_user, list_user_directory, set_user_status,
     get_settings, update_settings,
     create_invite, get_invite_by_token, mark_invite_used,
     create_session, get_session, revoke_all_sessions, list_sessions,
     add_trade, update_trade, list_open_trades, list_closed_trades, close_trade,
-    add_missed, list_missed, resolve_missed, compute_stats, sum_open_capital,
+    add_missed, list_missed, resolve_missed, compute_stats, sum_open_capital, open_capital_by_ccy,
+    load_fx_rates, get_fx_table,
 )
 from tokens import make_token, verify_token
 from mailer import send_email
 from risk import risk_nudges
+from fx import FxRateMissing, fmt_money, market_ccy, CCY_SYMBOL
 
 st.set_page_config(page_title="Swing Tracker v2.2 — Invite Only", layout="centered")
 init_db()
 ensure_owner()  # optional auto-owner via env (OWNER_EMAIL)
 
+@st.cache_resource
+def _load_fx_once():
+    return load_fx_rates()  # FX_RATES_DIR csv files -> fx_rates, once per process
+_load_fx_once()
+
 # ------------- helpers -------------
 def _qp(name: str):
     try:
@@ -59,6 +65,9 @@ def _create_very_long_session(u: dict):
     create_session(user_id=u["id"], refresh_token=rt, expires_at=exp, user_agent=st.session_state.get("_user_agent",""))
     _set_user(u, rt)
 
+def _fmt_by_ccy(amounts: dict) -> str:
+    return " + ".join(fmt_money(v, c) for c, v in amounts.items()) or fmt_money(0, "INR")
+
 def logout_here():
     st.session_state.pop("user", None)
     st.session_state.pop("refresh_token", None)
@@ -144,27 +153,34 @@ if st.sidebar.button("Logout everywhere"):
     logout_here()
     st.rerun()
 
-home_tab, trades_tab, missed_tab, insights_tab, settings_tab, admin_tab = st.tabs(
-    ["Home (Quick Add)", "Trades", "Missed", "Insights", "Settings", "Admin"]
-)
+# Only the selected section runs its loaders/renderers on a rerun; each one is
+# a fragment so widget interactions inside it rerun just that section.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+SECTIONS = ["Home (Quick Add)", "Trades", "Missed", "Insights", "Settings", "Admin"]
+section = st.sidebar.radio("Section", SECTIONS, key="nav_section")
 
 # -------- HOME --------
-with home_tab:
+@_fragment
+def _render_home(uid: int):
     st.subheader("➕ Add Trade (India-first)")
     s = get_settings(uid)
+    markets = ["IN","US","AU"]
+    market = st.selectbox("Market", markets, index=markets.index(s.get("market_default") or "IN"), key="quick_add_market")
+    sym = CCY_SYMBOL[market_ccy(market)]
     with st.form("quick_add", clear_on_submit=True):
         col1, col2 = st.columns(2)
         symbol = col1.text_input("Symbol*", placeholder="e.g., JIOFIN").upper().strip()
         qty = col2.number_input("Qty*", min_value=1, step=1)
         col3, col4 = st.columns(2)
-        buy = col3.number_input("Buy Price (₹)*", min_value=0.0, step=0.05, format="%.2f")
-        capital = col4.number_input("Capital Used (₹)", min_value=0.0, step=100.0)
+        buy = col3.number_input(f"Buy Price ({sym})*", min_value=0.0, step=0.05, format="%.2f")
+        capital = col4.number_input(f"Capital Used ({sym})", min_value=0.0, step=100.0)
         col5, col6 = st.columns(2)
-        sl1 = col5.number_input("SL1 (₹)", min_value=0.0, step=0.05, format="%.2f")
-        sl2 = col6.number_input("SL2 (₹)", min_value=0.0, step=0.05, format="%.2f")
+        sl1 = col5.number_input(f"SL1 ({sym})", min_value=0.0, step=0.05, format="%.2f")
+        sl2 = col6.number_input(f"SL2 ({sym})", min_value=0.0, step=0.05, format="%.2f")
         col7, col8 = st.columns(2)
-        t1 = col7.number_input("T1 (₹)", min_value=0.0, step=0.05, format="%.2f")
-        t2 = col8.number_input("T2 (₹)", min_value=0.0, step=0.05, format="%.2f")
+        t1 = col7.number_input(f"T1 ({sym})", min_value=0.0, step=0.05, format="%.2f")
+        t2 = col8.number_input(f"T2 ({sym})", min_value=0.0, step=0.05, format="%.2f")
         sector = st.text_input("Sector (optional)", placeholder="e.g., Financials")
         setup_tag = st.selectbox("Setup (optional)", ["", "Breakout", "Pullback", "Reversal", "Retest", "Momentum"], index=0)
         notes = st.text_area("Notes (optional)")
@@ -175,7 +191,7 @@ with home_tab:
             else:
                 tid = add_trade(uid, symbol, qty, buy,
                                 sl1 or None, sl2 or None, t1 or None, t2 or None,
-                                capital or None, sector or None, setup_tag or None, notes or None, market="IN")
+                                capital or None, sector or None, setup_tag or None, notes or None, market=market)
                 st.success(f"Saved trade #{tid} — {symbol}")
                 open_trades = list_open_trades(uid)
                 this_trade = next((t for t in open_trades if t["id"] == tid), None)
@@ -202,12 +218,14 @@ with home_tab:
             cc3.metric("Qty", f"{r['qty']}")
 
 # -------- TRADES --------
-with trades_tab:
+@_fragment
+def _render_trades(uid: int):
+    import pandas as pd  # deferred: only sections with tables pay for it
     st.subheader("Open Trades")
     data = list_open_trades(uid)
     if data:
         df = pd.DataFrame(data)
-        cols = ["id","created_at","symbol","qty","buy_price","sl1","sl2","t1","t2","capital","sector","setup_tag"]
+        cols = ["id","created_at","market","symbol","qty","buy_price","sl1","sl2","t1","t2","capital","sector","setup_tag"]
         st.dataframe(df[cols], use_container_width=True)
     else:
         st.caption("No open trades.")
@@ -216,7 +234,7 @@ with trades_tab:
     st.subheader("Close (Tap Sold)")
     c1, c2 = st.columns(2)
     tid = c1.number_input("Trade ID", min_value=1, step=1)
-    sell_price = c2.number_input("Sell Price (₹)", min_value=0.0, step=0.05, format="%.2f")
+    sell_price = c2.number_input("Sell Price (trade's currency)", min_value=0.0, step=0.05, format="%.2f")
     post_exit = st.text_input("Post-exit move (optional)")
     review = st.selectbox("Review", ["", "Good trade", "Bad trade", "Emotional exit", "Emotional buy", "Could have waited", "Perfect execution"], index=0)
     if st.button("Close Now"):
@@ -224,7 +242,8 @@ with trades_tab:
             commission_pct = float(get_settings(uid).get("commission_pct") or 0.03)
             res = close_trade(int(tid), uid, float(sell_price), commission_pct, post_exit or None, review or None)
             if res:
-                st.success(f"Closed #{tid} at ₹{sell_price:.2f}. P&L and hold days computed.")
+                t = next((t for t in data if t["id"] == int(tid)), {})
+                st.success(f"Closed #{tid} at {fmt_money(sell_price, market_ccy(t.get('market')), 2)}. P&L and hold days computed.")
             else:
                 st.error("Trade not found or not yours.")
         else:
@@ -235,13 +254,15 @@ with trades_tab:
     closed = list_closed_trades(uid)
     if closed:
         cdf = pd.DataFrame(closed)
-        show = ["id","symbol","qty","buy_price","sell_price","hold_days","fees_abs","pnl_abs","pnl_pct","sell_date","review_comment"]
+        show = ["id","market","symbol","qty","buy_price","sell_price","hold_days","fees_abs","pnl_abs","pnl_pct","sell_date","review_comment"]
         st.dataframe(cdf[show], use_container_width=True)
     else:
         st.caption("No closed trades yet.")
 
 # -------- MISSED --------
-with missed_tab:
+@_fragment
+def _render_missed(uid: int):
+    import pandas as pd
     st.subheader("Missed Opportunities")
     with st.form("missed_add", clear_on_submit=True):
         ms = st.text_input("Symbol*", placeholder="e.g., APOLLOTYRE").upper().strip()
@@ -277,28 +298,42 @@ with missed_tab:
         st.caption("No active missed ideas.")
 
 # -------- INSIGHTS --------
-with insights_tab:
+@_fragment
+def _render_insights(uid: int):
     st.subheader("Insights")
     stats = compute_stats(uid)
+    base = stats["base_ccy"]
     col1, col2, col3 = st.columns(3)
     col1.metric("Win Rate", f"{(stats.get('win_rate_pct') or 0):.1f}%")
-    col2.metric("Realized P&L", f"₹{(stats.get('realized') or 0):,.0f}")
+    if stats.get("fx_missing"):
+        col2.metric("Realized P&L", _fmt_by_ccy(stats["realized_by_ccy"]))
+    else:
+        col2.metric("Realized P&L", fmt_money(stats.get("realized") or 0, base))
     col3.metric("Closed Trades", stats.get("closed_count") or 0)
 
     st.markdown("---")
-    open_cap = sum_open_capital(uid)
     pool = float(get_settings(uid).get("capital_pool") or 500000)
-    remaining = max(0.0, pool - open_cap)
-    st.write(f"**Capital Pool:** ₹{pool:,.0f}  |  **Open Allocation:** ₹{open_cap:,.0f}  |  **Available:** ₹{remaining:,.0f}")
+    try:
+        open_cap = sum_open_capital(uid, base)
+    except FxRateMissing as e:
+        st.warning(f"FX rates for {e.ccy} unavailable; amounts are shown in their own currency.")
+        st.write(f"**Capital Pool:** {fmt_money(pool, base)}  |  **Open Allocation:** {_fmt_by_ccy(open_capital_by_ccy(uid))}")
+    else:
+        remaining = max(0.0, pool - open_cap)
+        st.write(f"**Capital Pool:** {fmt_money(pool, base)}  |  **Open Allocation:** {fmt_money(open_cap, base)}  |  **Available:** {fmt_money(remaining, base)}")
+    if stats.get("fx_missing"):
+        st.caption("Realized P&L is shown per currency until FX rates are loaded.")
 
 # -------- SETTINGS --------
-with settings_tab:
+@_fragment
+def _render_settings(uid: int):
     st.subheader("Preferences (per user)")
     s = get_settings(uid)
     with st.form("prefs"):
         colA, colB, colC = st.columns(3)
         market_default = colA.selectbox("Default Market", ["IN","US","AU"], index=["IN","US","AU"].index(s.get("market_default","IN")))
-        capital_pool = colB.number_input("Capital Pool (₹)", value=float(s.get("capital_pool") or 500000), step=10000.0)
+        base = market_ccy(s.get("market_default"))
+        capital_pool = colB.number_input(f"Capital Pool ({CCY_SYMBOL[base]})", value=float(s.get("capital_pool") or 500000), step=10000.0)
         commission_pct = colC.number_input("Commission % (one-way)", value=float(s.get("commission_pct") or 0.03), step=0.01, format="%.2f")
 
         colD, colE = st.columns(2)
@@ -306,12 +341,21 @@ with settings_tab:
         max_open = colE.number_input("Max Open Trades", value=int(s.get("max_open_trades") or 3), step=1)
 
         if st.form_submit_button("Save Settings"):
-            update_settings(uid, market_default=market_default, capital_pool=capital_pool,
-                            commission_pct=commission_pct, max_risk_per_trade_pct=max_risk, max_open_trades=int(max_open))
-            st.success("Settings saved.")
+            # the pool is kept in the base currency, so it moves with the default market
+            new_base = market_ccy(market_default)
+            try:
+                capital_pool = capital_pool * get_fx_table().rate(base, new_base)
+            except FxRateMissing as e:
+                st.error(f"FX rates for {e.ccy} unavailable; cannot switch the capital pool to {new_base}.")
+            else:
+                update_settings(uid, market_default=market_default, capital_pool=capital_pool,
+                                commission_pct=commission_pct, max_risk_per_trade_pct=max_risk, max_open_trades=int(max_open))
+                st.success("Settings saved." if new_base == base else f"Settings saved. Capital pool converted to {fmt_money(capital_pool, new_base)}.")
 
 # -------- ADMIN --------
-with admin_tab:
+@_fragment
+def _render_admin(uid: int):
+    import pandas as pd
     st.subheader("Invite & Manage Users")
     st.caption("Magic links are single-use; sessions are long-lived until you revoke.")
 
@@ -333,16 +377,46 @@ with admin_tab:
 
     st.markdown("---")
     st.write("**Users**")
-    udf = pd.DataFrame(list_users())
+    colf, cols, cold = st.columns(3)
+    status_f = colf.selectbox("Status", ["All", "active", "suspended"], key="dir_status")
+    sort = cols.selectbox("Sort by", ["created_at", "last_login_at", "name", "email"], key="dir_sort")
+    descending = cold.selectbox("Order", ["Newest/Z-A", "Oldest/A-Z"], key="dir_order") == "Newest/Z-A"
+    # cursor stack: one entry per page visited, reset when filter/sort changes
+    view = (status_f, sort, descending)
+    if st.session_state.get("dir_view") != view:
+        st.session_state.dir_view = view
+        st.session_state.dir_cursors = [None]
+    cursors = st.session_state.dir_cursors
+    page = list_user_directory(status=None if status_f == "All" else status_f, sort=sort,
+                               descending=descending, after=cursors[-1])
+    udf = pd.DataFrame(page["rows"])
     if not udf.empty:
-        st.dataframe(udf[["id","name","email","status","last_login_at","created_at"]], use_container_width=True)
-        uid_edit = st.number_input("User ID", min_value=0, step=1)
-        colx, coly, colz = st.columns(3)
-        if colx.button("Suspend"):
-            set_user_status(int(uid_edit), "suspended"); st.success("Suspended.")
-        if coly.button("Activate"):
-            set_user_status(int(uid_edit), "active"); st.success("Activated.")
-        if colz.button("Logout everywhere"):
-            revoke_all_sessions(int(uid_edit)); st.success("All sessions revoked.")
+        st.dataframe(udf[["id","name","email","status","base_ccy","open_trades","open_capital","closed_trades","realized",
+                          "active_sessions","last_login_at","created_at"]], use_container_width=True)
     else:
-        st.caption("No users yet.")
+        st.caption("No users match." if status_f != "All" or len(cursors) > 1 else "No users yet.")
+    colp, coln = st.columns(2)
+    if colp.button("◀ Prev", disabled=len(cursors) == 1):
+        cursors.pop(); st.rerun()
+    if coln.button("Next ▶", disabled=page["next_cursor"] is None):
+        cursors.append(page["next_cursor"]); st.rerun()
+
+    uid_edit = st.number_input("User ID", min_value=0, step=1)
+    colx, coly, colz = st.columns(3)
+    if colx.button("Suspend"):
+        set_user_status(int(uid_edit), "suspended"); st.success("Suspended.")
+    if coly.button("Activate"):
+        set_user_status(int(uid_edit), "active"); st.success("Activated.")
+    if colz.button("Logout everywhere"):
+        revoke_all_sessions(int(uid_edit)); st.success("All sessions revoked.")
+
+# -------- DISPATCH --------
+_RENDERERS = {
+    "Home (Quick Add)": _render_home,
+    "Trades": _render_trades,
+    "Missed": _render_missed,
+    "Insights": _render_insights,
+    "Settings": _render_settings,
+    "Admin": _render_admin,
+}
+_RENDERERS[section](uid)
@@ -1,8 +1,12 @@
-import os, sqlite3
+import os, sqlite3, time, logging, json
 from pathlib import Path
 from datetime import datetime
+from fx import FxTable, FxRateMissing, read_rate_files, market_ccy
+
+log = logging.getLogger(__name__)
 
 DB_PATH = os.environ.get("TRACKER_DB_PATH", str(Path(__file__).resolve().parent / "tracker.db"))
+FX_RATES_DIR = os.environ.get("FX_RATES_DIR", str(Path(__file__).resolve().parent / "data" / "fx"))
 
 def get_conn():
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
@@ -67,9 +71,19 @@ def init_db():
       FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
     );
 
+    CREATE TABLE IF NOT EXISTS fx_rates(
+      ccy TEXT NOT NULL, as_of TEXT NOT NULL, inr_rate REAL NOT NULL,
+      PRIMARY KEY(ccy, as_of)
+    );
+
     CREATE INDEX IF NOT EXISTS idx_trades_user ON trades(user_id);
     CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol);
     CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status);
+    CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id);
+    CREATE INDEX IF NOT EXISTS idx_users_dir_created ON users(COALESCE(created_at,''), id);
+    CREATE INDEX IF NOT EXISTS idx_users_dir_login ON users(COALESCE(last_login_at,''), id);
+    CREATE INDEX IF NOT EXISTS idx_users_dir_name ON users(COALESCE(name,''), id);
+    CREATE INDEX IF NOT EXISTS idx_users_dir_email ON users(COALESCE(email,''), id);
     """)
     conn.commit()
 
@@ -95,13 +109,15 @@ def create_user(email: str, name: str):
     uid = cur.lastrowid
     cur.execute("INSERT INTO user_settings(user_id) VALUES(?)", (uid,))
     conn.commit()
+    _directory_cache.clear()
     return get_user_by_email(email)
 
 def update_user(user_id: int, **fields):
     if not fields: return False
     conn = get_conn()
     sets = ", ".join([f"{k}=?" for k in fields.keys()])
-    conn.execute(f"UPDATE users SET {sets} WHERE id=?", [*fields.values(), user_id]); conn.commit(); return True
+    conn.execute(f"UPDATE users SET {sets} WHERE id=?", [*fields.values(), user_id]); conn.commit()
+    _directory_cache.clear(); return True
 
 def set_user_status(user_id: int, status: str):
     return update_user(user_id, status=status)
@@ -111,12 +127,94 @@ def list_users():
     rows = conn.execute("SELECT * FROM users ORDER BY created_at DESC").fetchall()
     return [dictify(r) for r in rows]
 
+# ---- admin directory
+# One page of users plus their trade/session aggregates in a single query; money
+# totals are converted into each user's base currency (None if rates are missing).
+# Keyset pagination: pass the returned next_cursor as `after` for the next page.
+# Cached for a short TTL; every user/session/trade writer clears the cache.
+DIRECTORY_SORTS = ("created_at", "last_login_at", "name", "email")  # each backed by an idx_users_dir_* index
+DIRECTORY_TTL_SECONDS = 15
+_directory_cache = {}
+
+def list_user_directory(status=None, sort="created_at", descending=True, after=None, limit=50):
+    if sort not in DIRECTORY_SORTS: raise ValueError(f"unsupported sort: {sort}")
+    key = (status, sort, descending, tuple(after) if after else None, limit)
+    hit = _directory_cache.get(key)
+    if hit and time.monotonic() - hit[0] < DIRECTORY_TTL_SECONDS:
+        return hit[1]
+
+    col = f"COALESCE(u.{sort},'')"
+    cmp, order = ("<", "DESC") if descending else (">", "ASC")
+    where, params = [], []
+    if status:
+        where.append("u.status=?"); params.append(status)
+    if after:
+        where.append(f"({col}, u.id) {cmp} (?, ?)"); params.extend(after)
+    sql = f"""
+        WITH page AS MATERIALIZED (
+          SELECT u.id, u.name, u.email, u.status, u.created_at, u.last_login_at, {col} AS sort_key
+          FROM users u
+          {"WHERE " + " AND ".join(where) if where else ""}
+          ORDER BY sort_key {order}, u.id {order}
+          LIMIT ?
+        ),
+        tm AS (
+          SELECT tr.user_id, tr.market, tr.status,
+            CASE WHEN tr.status='closed' THEN substr(tr.sell_date,1,10) END AS day,
+            COUNT(*) AS n, COALESCE(SUM(tr.capital),0) AS capital, COALESCE(SUM(tr.pnl_abs),0) AS pnl
+          FROM page p CROSS JOIN trades tr ON tr.user_id=p.id GROUP BY tr.user_id, tr.market, tr.status, day
+        ),
+        t AS (
+          SELECT user_id,
+            SUM(CASE WHEN status='open' THEN n END) AS open_trades,
+            SUM(CASE WHEN status='closed' THEN n END) AS closed_trades,
+            json_group_array(json_array(market, status, day, capital, pnl)) AS money
+          FROM tm GROUP BY user_id
+        ),
+        s AS (
+          SELECT se.user_id, COUNT(*) AS active_sessions
+          FROM page p CROSS JOIN sessions se ON se.user_id=p.id
+          WHERE (se.revoked=0 OR se.revoked IS NULL) AND se.expires_at > strftime('%Y-%m-%dT%H:%M:%S','now')
+          GROUP BY se.user_id
+        )
+        SELECT p.*, us.market_default, COALESCE(t.open_trades,0) AS open_trades,
+               COALESCE(t.closed_trades,0) AS closed_trades, t.money,
+               COALESCE(s.active_sessions,0) AS active_sessions
+        FROM page p LEFT JOIN user_settings us ON us.user_id=p.id
+        LEFT JOIN t ON t.user_id=p.id LEFT JOIN s ON s.user_id=p.id
+        ORDER BY p.sort_key {order}, p.id {order}
+    """
+    conn = get_conn()
+    rows = [dictify(r) for r in conn.execute(sql, [*params, limit + 1]).fetchall()]
+    more, rows = len(rows) > limit, rows[:limit]  # the extra row only tells us whether a next page exists
+    next_cursor = (rows[-1]["sort_key"], rows[-1]["id"]) if more else None
+    fx = get_fx_table()
+    for r in rows:
+        r.pop("sort_key")
+        # money totals per user: open capital at latest rates, realized P&L at each sell day's rate
+        r["base_ccy"] = base = market_ccy(r.pop("market_default"))
+        groups = json.loads(r.pop("money") or "[]")
+        opened = [g for g in groups if g[1] == "open"]
+        closed = [g for g in groups if g[1] == "closed"]
+        try:
+            r["open_capital"] = fx.convert_sum([g[3] for g in opened], [market_ccy(g[0]) for g in opened], base)
+            r["realized"] = fx.convert_sum([g[4] for g in closed], [market_ccy(g[0]) for g in closed], base, [g[2] for g in closed])
+        except FxRateMissing:
+            r["open_capital"] = r["realized"] = None
+    result = {"rows": rows, "next_cursor": next_cursor}
+    if len(_directory_cache) > 256: _directory_cache.clear()
+    _directory_cache[key] = (time.monotonic(), result)
+    return result
+
 # ---- settings
 def get_settings(user_id: int):
     conn = get_conn()
     r = conn.execute("SELECT * FROM user_settings WHERE user_id=?", (user_id,)).fetchone()
     return dictify(r) if r else {}
 
+def base_currency(user_id: int) -> str:
+    return market_ccy(get_settings(user_id).get("market_default"))
+
 def update_settings(user_id: int, **fields): return update_user_settings(user_id, **fields)
 
 def update_user_settings(user_id: int, **fields):
@@ -143,7 +241,7 @@ def create_session(user_id: int, refresh_token: str, expires_at: str, user_agent
     u = get_user(user_id)
     conn = get_conn(); cur = conn.cursor()
     cur.execute("INSERT INTO sessions(user_id,refresh_token,email,user_agent,expires_at) VALUES(?,?,?,?,?)", (user_id, refresh_token, u["email"], user_agent[:200], expires_at))
-    conn.commit(); return cur.lastrowid
+    conn.commit(); _directory_cache.clear(); return cur.lastrowid
 
 def get_user(user_id: int):
     conn = get_conn(); r = conn.execute("SELECT * FROM users WHERE id=?", (user_id,)).fetchone()
@@ -160,6 +258,7 @@ def list_sessions(user_id: int):
 
 def revoke_all_sessions(user_id: int):
     conn = get_conn(); conn.execute("UPDATE sessions SET revoked=1 WHERE user_id=?", (user_id,)); conn.commit()
+    _directory_cache.clear()
 
 # ---- trades
 def add_trade(user_id:int, symbol:str, qty:int, buy_price:float, sl1=None, sl2=None, t1=None, t2=None, capital=None, sector=None, setup_tag=None, notes=None, market="IN"):
@@ -168,7 +267,7 @@ def add_trade(user_id:int, symbol:str, qty:int, buy_price:float, sl1=None, sl2=N
         INSERT INTO trades(user_id,symbol,qty,buy_price,sl1,sl2,t1,t2,capital,sector,setup_tag,notes,market,updated_at)
         VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,datetime('now'))
     """,(user_id, symbol.upper().strip(), qty, buy_price, sl1, sl2, t1, t2, capital, sector, setup_tag, notes, market))
-    conn.commit(); return cur.lastrowid
+    conn.commit(); _directory_cache.clear(); return cur.lastrowid
 
 def list_open_trades(user_id:int):
     conn = get_conn(); rows = conn.execute("SELECT * FROM trades WHERE user_id=? AND status='open' ORDER BY created_at DESC",(user_id,)).fetchall()
@@ -183,7 +282,7 @@ def update_trade(trade_id:int, user_id:int, **fields):
     conn = get_conn()
     sets = ", ".join([f"{k}=?" for k in fields.keys()])
     conn.execute(f"UPDATE trades SET {sets}, updated_at=datetime('now') WHERE id=? AND user_id=?", [*fields.values(), trade_id, user_id])
-    conn.commit(); return True
+    conn.commit(); _directory_cache.clear(); return True
 
 def close_trade(trade_id:int, user_id:int, sell_price:float, commission_pct:float, post_exit:str=None, review:str=None):
     conn = get_conn(); cur = conn.cursor()
@@ -204,12 +303,23 @@ def close_trade(trade_id:int, user_id:int, sell_price:float, commission_pct:floa
         UPDATE trades SET status='closed', sell_price=?, sell_date=?, hold_days=?, pnl_abs=?, pnl_pct=?, fees_abs=?, post_exit_move=?, review_comment=?, updated_at=datetime('now')
         WHERE id=? AND user_id=?
     """,(sell_price, sold_at.isoformat(), hold_days, pnl_abs, pnl_pct, fees, post_exit, review, trade_id, user_id))
-    conn.commit(); return trade_id
+    conn.commit(); _directory_cache.clear(); return trade_id
 
-def sum_open_capital(user_id:int) -> float:
+def open_capital_by_ccy(user_id:int) -> dict:
+    """Unconverted open capital per currency, e.g. {'INR': 120000.0, 'USD': 800.0}."""
     conn = get_conn()
-    row = conn.execute("SELECT COALESCE(SUM(capital),0) AS s FROM trades WHERE user_id=? AND status='open'", (user_id,)).fetchone()
-    return float(dictify(row)["s"] or 0.0)
+    rows = conn.execute("SELECT market, COALESCE(SUM(capital),0) AS s FROM trades WHERE user_id=? AND status='open' GROUP BY market", (user_id,)).fetchall()
+    out = {}
+    for r in rows:
+        ccy = market_ccy(r["market"]); out[ccy] = out.get(ccy, 0.0) + float(r["s"])
+    return out
+
+def sum_open_capital(user_id:int, base:str=None) -> float:
+    """Open capital in `base` (the user's base currency by default), at the latest rates.
+    Raises FxRateMissing if a held currency cannot be converted."""
+    base = base or base_currency(user_id)
+    by_ccy = open_capital_by_ccy(user_id)
+    return get_fx_table().convert_sum(list(by_ccy.values()), list(by_ccy.keys()), base)
 
 # ---- missed
 def add_missed(user_id:int, symbol:str, sector=None, setup_tag=None, trigger_price=None, reason_missed=None, high_after=None, move_pct=None, lesson=None):
@@ -247,4 +357,41 @@ def compute_stats(user_id:int):
     d = dictify(row) if row else {}
     total_closed = (d.get("wins") or 0) + (d.get("losses") or 0)
     d["win_rate_pct"] = round((d.get("wins") or 0) / total_closed * 100.0, 2) if total_closed else None
+    # realized P&L converted at each sell date's rate; grouped per market/day to keep the vectors short
+    base = d["base_ccy"] = base_currency(user_id)
+    rows = conn.execute("""
+        SELECT market, substr(sell_date,1,10) AS day, SUM(pnl_abs) AS pnl
+        FROM trades WHERE user_id=? AND status='closed' GROUP BY market, day
+    """,(user_id,)).fetchall()
+    d["realized_by_ccy"] = {}
+    for r in rows:
+        ccy = market_ccy(r["market"]); d["realized_by_ccy"][ccy] = d["realized_by_ccy"].get(ccy, 0.0) + float(r["pnl"] or 0.0)
+    d["fx_missing"] = None
+    if rows:
+        try:
+            d["realized"] = get_fx_table().convert_sum([r["pnl"] for r in rows], [market_ccy(r["market"]) for r in rows], base, [r["day"] for r in rows])
+        except FxRateMissing as e:
+            # callers fall back to realized_by_ccy, shown unconverted
+            d["realized"], d["fx_missing"] = None, e.ccy
     return d
+
+# ---- fx
+_fx_table = None
+
+def load_fx_rates(directory: str = FX_RATES_DIR) -> int:
+    """Upsert rates from the CSV files in `directory` and drop the in-memory table."""
+    global _fx_table
+    rows = read_rate_files(directory) if os.path.isdir(directory) else []
+    conn = get_conn()
+    conn.executemany("INSERT OR REPLACE INTO fx_rates(ccy,as_of,inr_rate) VALUES(?,?,?)", rows); conn.commit()
+    _fx_table = None
+    if not conn.execute("SELECT 1 FROM fx_rates LIMIT 1").fetchone():
+        log.warning("No FX rates loaded from %s; non-INR amounts will be shown unconverted.", directory)
+    return len(rows)
+
+def get_fx_table() -> FxTable:
+    global _fx_table
+    if _fx_table is None:
+        conn = get_conn()
+        _fx_table = FxTable(conn.execute("SELECT ccy, as_of, inr_rate FROM fx_rates").fetchall())
+    return _fx_table
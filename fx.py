@@ -0,0 +1,89 @@
+import csv
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Rates are stored against INR: 1 unit of `ccy` = `inr_rate` INR on `as_of` (YYYY-MM-DD).
+PIVOT_CCY = "INR"
+MARKET_CCY = {"IN": "INR", "US": "USD", "AU": "AUD"}
+CCY_SYMBOL = {"INR": "₹", "USD": "$", "AUD": "A$"}
+
+class FxRateMissing(KeyError):
+    """Raised when an amount needs converting from/to a currency with no loaded rates."""
+
+    def __init__(self, ccy: str):
+        super().__init__(ccy)
+        self.ccy = ccy
+
+    def __str__(self):
+        return f"no FX rates loaded for {self.ccy}"
+
+def market_ccy(market: Optional[str]) -> str:
+    return MARKET_CCY.get((market or "IN").upper(), PIVOT_CCY)
+
+def fmt_money(amount: float, ccy: str, places: int = 0) -> str:
+    return f"{CCY_SYMBOL.get(ccy, ccy + ' ')}{amount:,.{places}f}"
+
+def read_rate_files(directory: str) -> List[Tuple[str, str, float]]:
+    """Read every *.csv under `directory` with columns date,ccy,inr_rate."""
+    rows = []
+    for path in sorted(Path(directory).glob("*.csv")):
+        with open(path, newline="") as f:
+            for r in csv.DictReader(f):
+                rows.append((r["ccy"].strip().upper(), r["date"].strip()[:10], float(r["inr_rate"])))
+    return rows
+
+class FxTable:
+    """In-memory as-of rate lookup; each currency keeps date-sorted parallel lists."""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, float]]):
+        import numpy as np
+
+        series: Dict[str, List[Tuple[str, float]]] = {}
+        for ccy, as_of, rate in rows:
+            series.setdefault(ccy, []).append((as_of[:10], float(rate)))
+        self._dates: Dict[str, List[str]] = {}
+        self._rates: Dict[str, List[float]] = {}
+        for ccy, pts in series.items():
+            pts.sort()
+            self._dates[ccy] = [d for d, _ in pts]
+            self._rates[ccy] = [r for _, r in pts]
+        # numpy copies for convert_sum, built once per table
+        self._date_arr = {ccy: np.asarray(d) for ccy, d in self._dates.items()}
+        self._rate_arr = {ccy: np.asarray(r, dtype=float) for ccy, r in self._rates.items()}
+
+    def inr_rate(self, ccy: str, as_of: Optional[str] = None) -> float:
+        """INR per unit of `ccy` on or before `as_of` (latest if None; earliest if as_of predates the table)."""
+        if ccy == PIVOT_CCY: return 1.0
+        if ccy not in self._dates: raise FxRateMissing(ccy)
+        dates = self._dates[ccy]
+        i = len(dates) if as_of is None else bisect_right(dates, as_of[:10])
+        return self._rates[ccy][max(i - 1, 0)]
+
+    def rate(self, ccy: str, base: str, as_of: Optional[str] = None) -> float:
+        if ccy == base: return 1.0
+        return self.inr_rate(ccy, as_of) / self.inr_rate(base, as_of)
+
+    def convert_sum(self, amounts: Sequence[float], ccys: Sequence[str], base: str,
+                    dates: Optional[Sequence[Optional[str]]] = None) -> float:
+        """Sum `amounts` (each in its own ccy, as of its date) in `base`, one vectorized pass per currency."""
+        if all(c == base for c in ccys):
+            return float(sum(a or 0.0 for a in amounts))
+        import numpy as np
+
+        amt = np.asarray([a or 0.0 for a in amounts], dtype=float)
+        ccy_arr = np.asarray(ccys)
+        when = np.asarray([(d or "9999-12-31")[:10] for d in dates] if dates is not None else ["9999-12-31"] * len(amt))
+        inr = np.ones_like(amt)
+        for ccy in set(ccys):
+            m = ccy_arr == ccy
+            inr[m] = self._inr_rates(ccy, when[m])
+        return float((amt * inr / self._inr_rates(base, when)).sum())
+
+    def _inr_rates(self, ccy: str, when):
+        import numpy as np
+
+        if ccy == PIVOT_CCY: return np.ones(len(when))
+        if ccy not in self._dates: raise FxRateMissing(ccy)
+        idx = np.searchsorted(self._date_arr[ccy], when, side="right") - 1
+        return self._rate_arr[ccy][np.clip(idx, 0, None)]
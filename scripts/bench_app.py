@@ -0,0 +1,63 @@
+"""Time app.py cold start and reruns against a large synthetic tracker DB.
+
+    python scripts/bench_app.py [APP_DIR] [--users N] [--trades N] [--reruns N]
+
+APP_DIR defaults to the repo root; point it at an exported older revision
+(git archive <rev> | tar -x -C /tmp/old) to compare before/after.
+"""
+import argparse, os, random, secrets, sqlite3, subprocess, sys, tempfile, time
+from pathlib import Path
+
+def build_db(path: str, app_dir: str, users: int, trades: int):
+    sys.path.insert(0, app_dir)
+    os.environ["TRACKER_DB_PATH"] = path
+    import db
+    db.init_db()
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users(name,email,status) VALUES(?,?,'active')",
+                     [(f"user{i}", f"user{i}@example.com") for i in range(users)])
+    conn.execute("INSERT INTO user_settings(user_id) SELECT id FROM users")
+    # the benchmarked user (id 1) owns every trade / missed idea
+    rows = []
+    for i in range(trades):
+        closed = i % 4 != 0
+        rows.append((1, f"SYM{i % 500}", 10, 100.0, 1000.0, "closed" if closed else "open",
+                     110.0 if closed else None, "2025-01-01T00:00:00" if closed else None, 50.0 if closed else None))
+    conn.executemany("INSERT INTO trades(user_id,symbol,qty,buy_price,capital,status,sell_price,sell_date,pnl_abs) VALUES(?,?,?,?,?,?,?,?,?)", rows)
+    conn.executemany("INSERT INTO missed(user_id,symbol) VALUES(1,?)", [(f"SYM{i}",) for i in range(trades // 10)])
+    rt = secrets.token_urlsafe(16)
+    conn.execute("INSERT INTO sessions(user_id,refresh_token,email,expires_at) VALUES(1,?,'user0@example.com','2999-01-01T00:00:00')", (rt,))
+    conn.commit()
+    return rt
+
+_CHILD = r"""
+import os, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(os.path.join(sys.argv[1], "app.py"), default_timeout=120)
+at.session_state["refresh_token"] = sys.argv[2]
+t1 = time.perf_counter(); at.run(); first = time.perf_counter() - t1
+assert not at.exception, at.exception
+reruns = []
+for _ in range(int(sys.argv[3])):
+    t = time.perf_counter(); at.run(); reruns.append(time.perf_counter() - t)
+reruns.sort()
+print(f"cold start (process + first run): {time.perf_counter() - t0 - sum(reruns):.3f}s  first run: {first:.3f}s  "
+      f"rerun median: {reruns[len(reruns)//2]*1000:.0f}ms  rerun max: {reruns[-1]*1000:.0f}ms")
+"""
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("app_dir", nargs="?", default=str(Path(__file__).resolve().parent.parent))
+    p.add_argument("--users", type=int, default=50000)
+    p.add_argument("--trades", type=int, default=20000)
+    p.add_argument("--reruns", type=int, default=10)
+    a = p.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tracker.db")
+        rt = build_db(path, a.app_dir, a.users, a.trades)
+        env = dict(os.environ, TRACKER_DB_PATH=path)
+        subprocess.run([sys.executable, "-c", _CHILD, a.app_dir, rt, str(a.reruns)], env=env, check=True)
+
+if __name__ == "__main__":
+    main()